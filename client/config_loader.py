@@ -2,9 +2,12 @@
 設定ファイル（INI形式）の読み込みと検証を行うモジュール
 """
 import configparser
+import functools
+import importlib.util
 import os
+import re
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
 
 class ConfigValidationError(Exception):
@@ -15,12 +18,18 @@ class ConfigValidationError(Exception):
 class SyncServerConfig:
     """個別サーバーの同期設定"""
     
-    def __init__(self, name: str, section: configparser.SectionProxy):
+    __slots__ = ('name', 'enabled', 'server_id', 'channel_id', 'local_path')
+    
+    def __init__(self, name: str, raw: Dict[str, str]):
+        # raw はセクションの内容（補間処理を行わない生の値）の辞書
         self.name = name
-        self.enabled = section.getboolean('enabled', fallback=False)
-        self.server_id = section.get('server_id', '')
-        self.channel_id = section.get('channel_id', '')
-        self.local_path = section.get('local_path', '')
+        enabled = raw.get('enabled', 'false').lower()
+        if enabled not in configparser.ConfigParser.BOOLEAN_STATES:
+            raise ConfigValidationError(f"[{name}]: enabled の値が不正です: {raw['enabled']}")
+        self.enabled = configparser.ConfigParser.BOOLEAN_STATES[enabled]
+        self.server_id = raw.get('server_id', '')
+        self.channel_id = raw.get('channel_id', '')
+        self.local_path = raw.get('local_path', '')
         
         # 検証
         if self.enabled:
@@ -45,20 +54,45 @@ class Config:
         
         self.config.read(config_path, encoding='utf-8')
         
+        # セクション一覧を一度だけ走査し、存在確認用の集合と [Sync.*] の一覧を作成
+        self._sections = {self.config.default_section}
+        self._sync_sections: List[str] = []
+        for section_name in self.config.sections():
+            self._sections.add(section_name)
+            if section_name.startswith('Sync.'):
+                self._sync_sections.append(section_name)
+        
         # 各セクションの読み込みと検証
+        # [Transfer] / [Files] / [Shadow] は最初のアクセス時に読み込む（__getattr__ 参照）
         self._load_server_config()
         self._load_sync_configs()
-        self._load_transfer_config()
-        self._load_files_config()
-        self._load_shadow_config()
+        
+        # 有効なサーバー設定（読み込み後は変更されないため一度だけ抽出）
+        self._enabled_servers: Dict[str, SyncServerConfig] = {
+            name: config for name, config in self.sync_servers.items()
+            if config.enabled
+        }
         
         # 有効なサーバー設定が1つ以上あるか確認
-        if not any(sync.enabled for sync in self.sync_servers.values()):
+        if not self._enabled_servers:
             raise ConfigValidationError("有効なサーバー設定が1つもありません")
     
+    def __getattr__(self, name):
+        """
+        遅延読み込み対象の属性に初めてアクセスした時点で該当セクションを読み込む
+        
+        各ローダーは検証がすべて成功した後にまとめて属性を設定するため、
+        検証エラー後に再アクセスした場合も再び ConfigValidationError となる
+        """
+        loader = _LAZY_ATTRS.get(name)
+        if loader is None:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        getattr(self, loader)()
+        return self.__dict__[name]
+    
     def _load_server_config(self):
         """[Server] セクションの読み込み"""
-        if 'Server' not in self.config:
+        if 'Server' not in self._sections:
             raise ConfigValidationError("[Server] セクションが見つかりません")
         
         self.websocket_url = self.config['Server'].get('websocket_url', '')
@@ -69,77 +103,148 @@ class Config:
         """[Sync.*] セクションの読み込み"""
         self.sync_servers: Dict[str, SyncServerConfig] = {}
         
-        for section_name in self.config.sections():
-            if section_name.startswith('Sync.'):
-                server_name = section_name[5:]  # "Sync." を除去
-                self.sync_servers[server_name] = SyncServerConfig(
-                    section_name, self.config[section_name]
-                )
+        for section_name in self._sync_sections:
+            server_name = section_name[5:]  # "Sync." を除去
+            # 値の補間は使用しないため raw=True で生の値を一度に取り出す
+            # （dict(SectionProxy) はキーごとに補間処理付きの get() を呼ぶ）
+            self.sync_servers[server_name] = SyncServerConfig(
+                section_name, dict(self.config.items(section_name, raw=True))
+            )
         
         if not self.sync_servers:
             raise ConfigValidationError("[Sync.*] セクションが1つも見つかりません")
     
     def _load_transfer_config(self):
         """[Transfer] セクションの読み込み"""
-        if 'Transfer' not in self.config:
+        if 'Transfer' not in self._sections:
             raise ConfigValidationError("[Transfer] セクションが見つかりません")
         
         transfer = self.config['Transfer']
-        self.max_file_size_mb = transfer.getint('max_file_size_mb', fallback=10)
-        self.send_interval_sec = transfer.getint('send_interval_sec', fallback=30)
-        self.additional_time_sec = transfer.getint('additional_time_sec', fallback=15)
-        self.packet_timeout_sec = transfer.getint('packet_timeout_sec', fallback=300)
+        max_file_size_mb = transfer.getint('max_file_size_mb', fallback=10)
+        send_interval_sec = transfer.getint('send_interval_sec', fallback=30)
+        additional_time_sec = transfer.getint('additional_time_sec', fallback=15)
+        packet_timeout_sec = transfer.getint('packet_timeout_sec', fallback=300)
         
         # 妥当性チェック
-        if self.max_file_size_mb <= 0:
+        if max_file_size_mb <= 0:
             raise ConfigValidationError("[Transfer]: max_file_size_mb は正の整数である必要があります")
-        if self.send_interval_sec < 0:
+        if send_interval_sec < 0:
             raise ConfigValidationError("[Transfer]: send_interval_sec は0以上である必要があります")
-        if self.additional_time_sec < 0:
+        if additional_time_sec < 0:
             raise ConfigValidationError("[Transfer]: additional_time_sec は0以上である必要があります")
-        if self.packet_timeout_sec <= 0:
+        if packet_timeout_sec <= 0:
             raise ConfigValidationError("[Transfer]: packet_timeout_sec は正の整数である必要があります")
+        
+        self.max_file_size_mb = max_file_size_mb
+        self.send_interval_sec = send_interval_sec
+        self.additional_time_sec = additional_time_sec
+        self.packet_timeout_sec = packet_timeout_sec
     
     def _load_files_config(self):
         """[Files] セクションの読み込み"""
-        if 'Files' not in self.config:
+        if 'Files' not in self._sections:
             raise ConfigValidationError("[Files] セクションが見つかりません")
         
         files = self.config['Files']
         extensions_str = files.get('supported_extensions', '.jpg,.jpeg,.png,.webp')
-        self.supported_extensions: List[str] = [
-            ext.strip() for ext in extensions_str.split(',')
-        ]
-        self.data_file_extension = files.get('data_file_extension', '.dat')
+        # 表示用に記述順を保持したタプルと、判定用の frozenset を持つ
+        extensions_display = tuple(
+            ext.strip().lower() for ext in extensions_str.split(',') if ext.strip()
+        )
+        data_file_extension = files.get('data_file_extension', '.dat')
+        integrity = files.get('integrity', 'sha256').strip().lower()
         
-        if not self.supported_extensions:
+        if not extensions_display:
             raise ConfigValidationError("[Files]: supported_extensions が空です")
-        if not self.data_file_extension:
+        if not data_file_extension:
             raise ConfigValidationError("[Files]: data_file_extension が設定されていません")
+        if integrity not in _INTEGRITY_MODES:
+            raise ConfigValidationError(f"[Files]: integrity の値が不正です: {integrity}")
+        if integrity == 'crc32c' and importlib.util.find_spec('google_crc32c') is None:
+            raise ConfigValidationError("[Files]: integrity = crc32c を使用するには google-crc32c をインストールしてください")
+        
+        self.supported_extensions_display: Tuple[str, ...] = extensions_display
+        self.supported_extensions: FrozenSet[str] = frozenset(extensions_display)
+        self.data_file_extension = data_file_extension
+        self.integrity = integrity
     
     def _load_shadow_config(self):
         """[Shadow] セクションの読み込み"""
-        if 'Shadow' not in self.config:
+        if 'Shadow' not in self._sections:
             raise ConfigValidationError("[Shadow] セクションが見つかりません")
         
         shadow = self.config['Shadow']
-        self.shadow_dir_name = shadow.get('shadow_dir_name', '.shadow')
-        self.temp_dir_name = shadow.get('temp_dir_name', 'temp')
-        self.hash_dir_name = shadow.get('hash_dir_name', 'hashes')
+        shadow_dir_name = shadow.get('shadow_dir_name', '.shadow')
+        temp_dir_name = shadow.get('temp_dir_name', 'temp')
+        hash_dir_name = shadow.get('hash_dir_name', 'hashes')
         
-        if not self.shadow_dir_name:
+        if not shadow_dir_name:
             raise ConfigValidationError("[Shadow]: shadow_dir_name が空です")
-        if not self.temp_dir_name:
+        if not temp_dir_name:
             raise ConfigValidationError("[Shadow]: temp_dir_name が空です")
-        if not self.hash_dir_name:
+        if not hash_dir_name:
             raise ConfigValidationError("[Shadow]: hash_dir_name が空です")
+        
+        self.shadow_dir_name = shadow_dir_name
+        self.temp_dir_name = temp_dir_name
+        self.hash_dir_name = hash_dir_name
     
     def get_enabled_servers(self) -> Dict[str, SyncServerConfig]:
         """有効なサーバー設定のみを返す"""
-        return {
-            name: config for name, config in self.sync_servers.items()
-            if config.enabled
-        }
+        return self._enabled_servers
+
+
+# 遅延読み込みする属性名 : 読み込みを行う Config のメソッド名
+_LAZY_ATTRS = {
+    'max_file_size_mb': '_load_transfer_config',
+    'send_interval_sec': '_load_transfer_config',
+    'additional_time_sec': '_load_transfer_config',
+    'packet_timeout_sec': '_load_transfer_config',
+    'supported_extensions': '_load_files_config',
+    'supported_extensions_display': '_load_files_config',
+    'data_file_extension': '_load_files_config',
+    'integrity': '_load_files_config',
+    'shadow_dir_name': '_load_shadow_config',
+    'temp_dir_name': '_load_shadow_config',
+    'hash_dir_name': '_load_shadow_config',
+}
+
+
+# [Files] integrity に指定できる整合性チェック方式
+# （hybrid_converter.INTEGRITY_SHA256 / INTEGRITY_CRC32C と同じ値）
+_INTEGRITY_MODES = ('sha256', 'crc32c')
+
+
+# path.ini の [Path] セクション本文（次のセクション見出しまで）
+_PATH_SECTION_RE = re.compile(r'^\s*\[Path\]\s*$(.*?)(?=^\s*\[|\Z)', re.M | re.S)
+# [Path] セクション内の config_file 行（ConfigParser と同様にキー名の大文字・小文字は区別しない）
+_CONFIG_FILE_RE = re.compile(r'^\s*config_file\s*[=:]\s*(.*?)\s*$', re.M | re.I)
+
+
+def _parse_path_ini(text: str) -> str:
+    """
+    path.ini の内容から [Path] セクションの config_file を取得する
+    
+    1項目を読むだけなので ConfigParser を使わず簡易的に解析する
+    
+    Args:
+        text: path.ini の内容
+    
+    Returns:
+        config_file に指定された値
+    
+    Raises:
+        ConfigValidationError: [Path] セクションまたは config_file が無い場合
+    """
+    section = _PATH_SECTION_RE.search(text)
+    if not section:
+        raise ConfigValidationError("path.ini に [Path] セクションがありません")
+    
+    match = _CONFIG_FILE_RE.search(section.group(1))
+    config_file = match.group(1) if match else ''
+    if not config_file:
+        raise ConfigValidationError("path.ini の [Path] セクションに config_file が設定されていません")
+    return config_file
 
 
 def find_config_file() -> str:
@@ -157,15 +262,7 @@ def find_config_file() -> str:
     
     # path.ini が存在する場合
     if path_ini.exists():
-        path_config = configparser.ConfigParser()
-        path_config.read(path_ini, encoding='utf-8')
-        
-        if 'Path' not in path_config:
-            raise ConfigValidationError("path.ini に [Path] セクションがありません")
-        
-        config_file = path_config['Path'].get('config_file', '')
-        if not config_file:
-            raise ConfigValidationError("path.ini の [Path] セクションに config_file が設定されていません")
+        config_file = _parse_path_ini(path_ini.read_text(encoding='utf-8'))
         
         # 相対パスの場合は client ディレクトリからの相対パスとして解決
         config_path = Path(config_file)
@@ -179,10 +276,18 @@ def find_config_file() -> str:
     return str(default_config.resolve())
 
 
+@functools.lru_cache(maxsize=4)
+def _load_config_cached(config_path: str, mtime_ns: int) -> Config:
+    """(パス, 更新時刻) をキーに Config をキャッシュする"""
+    return Config(config_path)
+
+
 def load_config() -> Config:
     """
     設定ファイルを読み込む
     
+    同じ設定ファイルが更新されていない間は、前回読み込んだ Config を返す
+    
     Returns:
         Config オブジェクト
     
@@ -190,4 +295,13 @@ def load_config() -> Config:
         ConfigValidationError: 設定ファイルの読み込みまたは検証に失敗した場合
     """
     config_path = find_config_file()
-    return Config(config_path)
+    try:
+        mtime_ns = os.stat(config_path).st_mtime_ns
+    except OSError:
+        # ファイルが存在しない場合などは Config 側で検証エラーとする
+        return Config(config_path)
+    return _load_config_cached(config_path, mtime_ns)
+
+
+# キャッシュのクリア（テスト用）
+load_config.cache_clear = _load_config_cached.cache_clear
@@ -81,3 +81,14 @@ ERROR_MESSAGES = {
 
 # デフォルト言語
 DEFAULT_LANGUAGE = "ja"
+
+# 言語別のフラットなメッセージテーブル（エラーID : メッセージ）
+# 指定言語のメッセージが無い場合はデフォルト言語で補完する
+ERROR_MESSAGES_JA = {
+    error_id: messages.get("ja") or messages.get(DEFAULT_LANGUAGE)
+    for error_id, messages in ERROR_MESSAGES.items()
+}
+ERROR_MESSAGES_EN = {
+    error_id: messages.get("en") or messages.get(DEFAULT_LANGUAGE)
+    for error_id, messages in ERROR_MESSAGES.items()
+}
@@ -4,97 +4,150 @@ Hybrid形式変換モジュール
 Discord上での画像プレビューを抑制する.dat形式に変換する
 """
 import os
+import re
 import hashlib
+import contextlib
+import tempfile
 from datetime import datetime
 from logger import get_logger
 
+try:
+    import google_crc32c
+except ImportError:  # CRC32C モードを使用しない場合は不要
+    google_crc32c = None
+
 
 # 定数
 HYBRID_HEADER_SIZE = 200  # 固定長ヘッダーサイズ（バイト）
 MAX_FILE_SIZE_MB = 10  # 最大ファイルサイズ（MB）
-SIZE_MARGIN = 1.02  # サイズマージン（2%）
+SIZE_MARGIN_PERCENT = 2  # サイズマージン（2%）
 MIN_FILE_SIZE = HYBRID_HEADER_SIZE  # 最小ファイルサイズ（200バイト）
+# 元ファイルの最大サイズ（元サイズ × 1.02 が上限以下となる最大値、整数演算で算出）
+MAX_SOURCE_FILE_SIZE = MAX_FILE_SIZE_MB * 1024 * 1024 * 100 // (100 + SIZE_MARGIN_PERCENT)
+COPY_BUFFER_SIZE = 1 << 20  # 変換時の読み書きバッファサイズ（1MB）
+
+# 整合性チェック方式
+INTEGRITY_SHA256 = "sha256"  # SHA-256（デフォルト）
+INTEGRITY_CRC32C = "crc32c"  # CRC32C（破損検知用、google-crc32c が必要）
+
+# 整合性チェック方式 : (ヘッダーのキー名, ログ表示名)
+_INTEGRITY_FIELDS = {
+    INTEGRITY_SHA256: ("SHA256", "SHA-256ハッシュ"),
+    INTEGRITY_CRC32C: ("CRC32C", "CRC32C"),
+}
+
+# 出力ファイルのパーミッション（open() で作成した場合と同じく umask を適用する）
+# mkstemp は 0600 で作成するため、配置前にこの値へ変更する
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_OUTPUT_FILE_MODE = 0o666 & ~_UMASK
+
+# Hybridヘッダーの書式とパディング用のnull文字列
+_HEADER_FORMAT = b"HYBRID-HEADER-V1\n%b:%b\nPath:%b\nSize:%d\nTime:%b\nOffset:%d"
+_HEADER_PADDING = bytes(HYBRID_HEADER_SIZE)
+
+# ヘッダーの「キー:値」行にマッチする正規表現
+_HEADER_LINE_RE = re.compile(rb'^([^:\n\x00]+):([^\n\x00]*)', re.M)
 
 
-def calculate_sha256(file_path):
+def _new_sha256():
     """
-    ファイルのSHA-256ハッシュを計算
+    SHA-256ハッシュオブジェクトを生成
+    
+    改ざん検知ではなく整合性確認用途のため usedforsecurity=False を指定し、
+    OpenSSLの高速な実装（SHA拡張命令など）を利用させる
+    """
+    return hashlib.new('sha256', usedforsecurity=False)
+
+
+class _Crc32c:
+    """google_crc32c.Checksum を hashlib と同じ update / hexdigest で扱うラッパー"""
+    
+    __slots__ = ('_checksum',)
+    
+    def __init__(self):
+        self._checksum = google_crc32c.Checksum()
+    
+    def update(self, data):
+        # C拡張は読み取り専用の bytes 系オブジェクトのみ受け付けるため memoryview はコピーする
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        self._checksum.update(data)
+    
+    def hexdigest(self):
+        return self._checksum.digest().hex()
+
+
+def _new_checksum(integrity):
+    """
+    整合性チェック方式に応じたチェックサムオブジェクトを生成
     
     Args:
-        file_path (str): ハッシュを計算するファイルのパス
+        integrity (str): 整合性チェック方式（INTEGRITY_SHA256 / INTEGRITY_CRC32C）
     
     Returns:
-        str: 64文字の16進数ハッシュ値
+        update(data) / hexdigest() を持つオブジェクト
     
     Raises:
-        Exception: ファイル読み込みエラー
+        ValueError: 不明な方式が指定された場合
+        RuntimeError: CRC32C が指定されたが google-crc32c が未インストールの場合
     """
-    sha256 = hashlib.sha256()
-    try:
-        with open(file_path, 'rb') as f:
-            # 4KBずつ読み込んでハッシュを更新
-            for chunk in iter(lambda: f.read(4096), b''):
-                sha256.update(chunk)
-        return sha256.hexdigest()
-    except Exception as e:
-        raise Exception(f"SHA-256計算エラー: {e}")
+    if integrity == INTEGRITY_SHA256:
+        return _new_sha256()
+    if integrity == INTEGRITY_CRC32C:
+        if google_crc32c is None:
+            raise RuntimeError("CRC32C を使用するには google-crc32c をインストールしてください")
+        return _Crc32c()
+    raise ValueError(f"不明な整合性チェック方式です: {integrity}")
 
 
-def validate_file_size(file_path):
+def validate_file_size(file_size):
     """
     ファイルサイズの妥当性を検証
     - 200バイト未満のファイルを除外
     - 元サイズ × 1.02 が 10MB を超えるファイルを除外
     
     Args:
-        file_path (str): 検証するファイルのパス
+        file_size (int): 検証するファイルのサイズ（バイト）
     
     Returns:
         tuple: (bool, str) - (検証結果, エラーメッセージ)
     """
-    try:
-        file_size = os.path.getsize(file_path)
-        
-        # 最小サイズチェック
-        if file_size < MIN_FILE_SIZE:
-            return False, "規定サイズ以下のファイルは共有されません"
-        
-        # 最大サイズチェック（2%マージン込み）
-        max_size_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
-        if file_size * SIZE_MARGIN > max_size_bytes:
-            return False, f"ファイルサイズが上限（{MAX_FILE_SIZE_MB}MB + 2%マージン）を超えています"
-        
-        return True, ""
-    except Exception as e:
-        return False, f"ファイルサイズ取得エラー: {e}"
+    # 最小サイズチェック
+    if file_size < MIN_FILE_SIZE:
+        return False, "規定サイズ以下のファイルは共有されません"
+    
+    # 最大サイズチェック（2%マージン込み）
+    if file_size > MAX_SOURCE_FILE_SIZE:
+        return False, f"ファイルサイズが上限（{MAX_FILE_SIZE_MB}MB + {SIZE_MARGIN_PERCENT}%マージン）を超えています"
+    
+    return True, ""
 
 
-def create_hybrid_header(sha256_hash, relative_path, original_size):
+def create_hybrid_header(checksum, relative_path, original_size, integrity=INTEGRITY_SHA256):
     """
     200バイト固定長のHybridヘッダーを生成
     
     Args:
-        sha256_hash (str): SHA-256ハッシュ（64文字）
+        checksum (str): SHA-256ハッシュ（64文字）またはCRC32C（8文字）の16進数文字列
         relative_path (str): ルートディレクトリからの相対パス
         original_size (int): 元ファイルのサイズ（バイト）
+        integrity (str, optional): 整合性チェック方式
     
     Returns:
         bytes: 200バイト固定長のヘッダー（UTF-8エンコード済み）
     """
     timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
     
-    # ヘッダー内容を構築
-    header_lines = [
-        "HYBRID-HEADER-V1",
-        f"SHA256:{sha256_hash}",
-        f"Path:{relative_path}",
-        f"Size:{original_size}",
-        f"Time:{timestamp}",
-        f"Offset:{HYBRID_HEADER_SIZE}"
-    ]
-    
-    header_text = "\n".join(header_lines)
-    header_bytes = header_text.encode('utf-8')
+    # ヘッダー内容をバイト列として直接構築（パス以外はASCII）
+    header_bytes = _HEADER_FORMAT % (
+        _INTEGRITY_FIELDS[integrity][0].encode('ascii'),
+        checksum.encode('ascii'),
+        relative_path.encode('utf-8'),
+        original_size,
+        timestamp.encode('ascii'),
+        HYBRID_HEADER_SIZE,
+    )
     
     # 200バイトを超える場合はエラー
     if len(header_bytes) >= HYBRID_HEADER_SIZE:
@@ -102,13 +155,10 @@ def create_hybrid_header(sha256_hash, relative_path, original_size):
     
     # 200バイトに満たない場合は null文字でパディング
     # （実際には200バイト未満になることはほぼないが、安全のため）
-    padding_size = HYBRID_HEADER_SIZE - len(header_bytes)
-    header_bytes += b'\x00' * padding_size
-    
-    return header_bytes
+    return header_bytes + _HEADER_PADDING[len(header_bytes):]
 
 
-def convert_to_hybrid(input_file, output_file, root_dir=None):
+def convert_to_hybrid(input_file, output_file, root_dir=None, integrity=INTEGRITY_SHA256):
     """
     画像ファイルをHybrid形式(.dat)に変換
     
@@ -116,25 +166,42 @@ def convert_to_hybrid(input_file, output_file, root_dir=None):
         input_file (str): 入力画像ファイルのパス
         output_file (str): 出力.datファイルのパス
         root_dir (str, optional): 相対パス計算のルートディレクトリ
+        integrity (str, optional): 整合性チェック方式（デフォルトはSHA-256）
     
     Returns:
         bool: 変換成功時True、失敗時False
     """
+    return convert_to_hybrid_checksum(input_file, output_file, root_dir, integrity) is not None
+
+
+def convert_to_hybrid_checksum(input_file, output_file, root_dir=None, integrity=INTEGRITY_SHA256):
+    """
+    画像ファイルをHybrid形式(.dat)に変換し、ヘッダーに記録したチェックサムを返す
+    
+    Args:
+        input_file (str): 入力画像ファイルのパス
+        output_file (str): 出力.datファイルのパス
+        root_dir (str, optional): 相対パス計算のルートディレクトリ
+        integrity (str, optional): 整合性チェック方式（デフォルトはSHA-256）
+    
+    Returns:
+        str or None: 変換成功時はチェックサム（16進文字列）、失敗時None
+    """
     logger = get_logger()
     
     try:
+        # ファイルサイズ取得（stat は1回のみ）
+        try:
+            original_size = os.stat(input_file).st_size
+        except Exception as e:
+            logger.log_error(f"ファイルサイズ取得エラー: {e}", input_file)
+            return None
+        
         # ファイルサイズ検証
-        is_valid, error_msg = validate_file_size(input_file)
+        is_valid, error_msg = validate_file_size(original_size)
         if not is_valid:
             logger.log_error(error_msg, input_file)
-            return False
-        
-        # SHA-256計算
-        try:
-            sha256_hash = calculate_sha256(input_file)
-        except Exception as e:
-            logger.log_exception(e, input_file, "SHA-256計算失敗")
-            return False
+            return None
         
         # 相対パス計算
         if root_dir:
@@ -142,47 +209,106 @@ def convert_to_hybrid(input_file, output_file, root_dir=None):
                 relative_path = os.path.relpath(input_file, root_dir)
             except Exception as e:
                 logger.log_exception(e, input_file, "相対パス計算失敗")
-                return False
+                return None
         else:
             relative_path = os.path.basename(input_file)
         
-        # ファイルサイズ取得
-        original_size = os.path.getsize(input_file)
-        
-        # Hybridヘッダー生成
+        # 出力ディレクトリが存在しない場合は作成
         try:
-            header_bytes = create_hybrid_header(sha256_hash, relative_path, original_size)
+            output_dir = os.path.dirname(output_file)
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir, exist_ok=True)
         except Exception as e:
-            logger.log_exception(e, input_file, "Hybridヘッダー生成失敗")
-            return False
+            logger.log_exception(e, output_file, "ファイル書き込み失敗")
+            return None
         
-        # バイナリデータ読み込み
+        # チェックサムオブジェクト生成
         try:
-            with open(input_file, 'rb') as f:
-                binary_data = f.read()
+            checksum = _new_checksum(integrity)
         except Exception as e:
-            logger.log_exception(e, input_file, "ファイル読み込み失敗")
-            return False
+            logger.log_exception(e, input_file, "整合性チェック方式の指定が不正")
+            return None
         
-        # Hybrid形式で書き込み（ヘッダー + バイナリ）
+        # チェックサム計算とバイナリ部のコピーを1パスで行う
+        # （一時ファイルにヘッダー領域をnull文字で仮確保し、コピー後にヘッダーで上書きする）
         try:
-            # 出力ディレクトリが存在しない場合は作成
-            output_dir = os.path.dirname(output_file)
-            if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir, exist_ok=True)
-            
-            with open(output_file, 'wb') as f:
-                f.write(header_bytes)
-                f.write(binary_data)
+            with open(input_file, 'rb', buffering=0) as f_in:
+                # 一時ファイルは呼び出しごとに一意な名前で作成し、並列変換時の衝突を防ぐ
+                fd, temp_file = tempfile.mkstemp(
+                    suffix=".part", prefix=os.path.basename(output_file) + ".",
+                    dir=output_dir or None
+                )
+                try:
+                    os.chmod(temp_file, _OUTPUT_FILE_MODE)
+                    with open(fd, 'wb', buffering=COPY_BUFFER_SIZE) as f_out:
+                        f_out.write(bytes(HYBRID_HEADER_SIZE))
+                        buf = bytearray(COPY_BUFFER_SIZE)
+                        view = memoryview(buf)
+                        copied = 0
+                        while n := f_in.readinto(buf):
+                            chunk = view[:n]
+                            checksum.update(chunk)
+                            f_out.write(chunk)
+                            copied += n
+                        
+                        # 変換中に元ファイルが変更された場合はヘッダーのサイズと一致しないため失敗とする
+                        if copied != original_size:
+                            raise OSError(f"変換中に元ファイルのサイズが変化しました: {original_size} -> {copied}")
+                        
+                        # Hybridヘッダー生成
+                        digest = checksum.hexdigest()
+                        header_bytes = create_hybrid_header(
+                            digest, relative_path, original_size, integrity
+                        )
+                        if hasattr(os, 'pwrite'):
+                            # 先頭への書き戻しを1回のシステムコールで行う
+                            f_out.flush()
+                            os.pwrite(f_out.fileno(), header_bytes, 0)
+                        else:
+                            # Windows等 pwrite が無い環境
+                            f_out.seek(0)
+                            f_out.write(header_bytes)
+                    
+                    # ヘッダーまで書き終えた場合のみ出力ファイルとして配置
+                    os.replace(temp_file, output_file)
+                except Exception:
+                    # この呼び出しで作成した一時ファイルのみ削除する（既存の出力ファイルは残す）
+                    try:
+                        os.remove(temp_file)
+                    except OSError:
+                        pass
+                    raise
         except Exception as e:
-            logger.log_exception(e, output_file, "ファイル書き込み失敗")
-            return False
+            logger.log_exception(e, input_file, "Hybridファイル生成失敗")
+            return None
         
-        return True
+        return digest
         
     except Exception as e:
         logger.log_exception(e, input_file, "Hybrid変換中の予期しないエラー")
-        return False
+        return None
+
+
+def _open_dat(dat_file):
+    """
+    .datファイルを読み込み用に開く
+    
+    オープン済みのファイルオブジェクトが渡された場合はそのまま使用し、閉じない
+    
+    Args:
+        dat_file (str or file): .datファイルのパス、またはバイナリモードで開いたファイル
+    
+    Returns:
+        ファイルオブジェクトを返すコンテキストマネージャ
+    """
+    if hasattr(dat_file, 'read'):
+        return contextlib.nullcontext(dat_file)
+    return open(dat_file, 'rb', buffering=0)
+
+
+def _dat_name(dat_file):
+    """ログ出力用に.datファイルのパスを取得"""
+    return getattr(dat_file, 'name', dat_file)
 
 
 def parse_hybrid_header(dat_file):
@@ -190,7 +316,7 @@ def parse_hybrid_header(dat_file):
     .datファイルからHybridヘッダーを解析
     
     Args:
-        dat_file (str): .datファイルのパス
+        dat_file (str or file): .datファイルのパス、またはバイナリモードで開いたファイル
     
     Returns:
         dict: ヘッダー情報の辞書、エラー時はNone
@@ -198,28 +324,23 @@ def parse_hybrid_header(dat_file):
     logger = get_logger()
     
     try:
-        with open(dat_file, 'rb') as f:
+        with _open_dat(dat_file) as f:
             # 200バイトのヘッダー部を読み込み
+            f.seek(0)
             header_bytes = f.read(HYBRID_HEADER_SIZE)
             
             if len(header_bytes) < HYBRID_HEADER_SIZE:
-                logger.log_error("ヘッダーサイズが不正です", dat_file)
+                logger.log_error("ヘッダーサイズが不正です", _dat_name(dat_file))
                 return None
             
-            # null文字を除去してデコード
-            header_text = header_bytes.rstrip(b'\x00').decode('utf-8')
-            
-            # ヘッダー情報をパース
-            header_info = {}
-            for line in header_text.split('\n'):
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    header_info[key.strip()] = value.strip()
-            
-            return header_info
+            # ヘッダー情報をバイト列のままパース（null文字のパディングはマッチしない）
+            return {
+                m.group(1).decode('utf-8'): m.group(2).decode('utf-8')
+                for m in _HEADER_LINE_RE.finditer(header_bytes)
+            }
             
     except Exception as e:
-        logger.log_exception(e, dat_file, "Hybridヘッダー解析失敗")
+        logger.log_exception(e, _dat_name(dat_file), "Hybridヘッダー解析失敗")
         return None
 
 
@@ -228,7 +349,7 @@ def extract_binary_from_hybrid(dat_file, output_file):
     .datファイルからバイナリ部を抽出して元の画像ファイルに復元
     
     Args:
-        dat_file (str): .datファイルのパス
+        dat_file (str or file): .datファイルのパス、またはバイナリモードで開いたファイル
         output_file (str): 復元する画像ファイルのパス
     
     Returns:
@@ -237,39 +358,58 @@ def extract_binary_from_hybrid(dat_file, output_file):
     logger = get_logger()
     
     try:
-        # ヘッダー解析
-        header_info = parse_hybrid_header(dat_file)
-        if not header_info:
-            return False
-        
-        # バイナリ部を読み込み
-        with open(dat_file, 'rb') as f:
-            # ヘッダー部をスキップ
-            f.seek(HYBRID_HEADER_SIZE)
-            binary_data = f.read()
-        
-        # SHA-256検証
-        sha256_hash = hashlib.sha256(binary_data).hexdigest()
-        expected_hash = header_info.get('SHA256', '')
-        
-        if sha256_hash != expected_hash:
-            logger.log_error(
-                f"SHA-256ハッシュ不一致: 期待値={expected_hash}, 実際={sha256_hash}",
-                dat_file
-            )
-            return False
-        
-        # 出力ディレクトリが存在しない場合は作成
-        output_dir = os.path.dirname(output_file)
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir, exist_ok=True)
-        
-        # バイナリデータを書き込み
-        with open(output_file, 'wb') as f:
-            f.write(binary_data)
+        # ヘッダー解析とバイナリ抽出で同じファイルを使い回す
+        with _open_dat(dat_file) as f_in:
+            # ヘッダー解析
+            header_info = parse_hybrid_header(f_in)
+            if not header_info:
+                return False
+            
+            # 整合性チェック方式（ヘッダーに記録された方式で検証する）
+            integrity = INTEGRITY_CRC32C if 'CRC32C' in header_info else INTEGRITY_SHA256
+            header_key, label = _INTEGRITY_FIELDS[integrity]
+            checksum = _new_checksum(integrity)
+            
+            # 出力ディレクトリが存在しない場合は作成
+            output_dir = os.path.dirname(output_file)
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir, exist_ok=True)
+            
+            # バイナリ部を一時ファイルへストリーミングしながらチェックサムを計算
+            # （バイナリ全体をメモリに展開しない）
+            temp_file = output_file + ".part"
+            try:
+                with open(temp_file, 'wb', buffering=COPY_BUFFER_SIZE) as f_out:
+                    # ヘッダー部をスキップ
+                    f_in.seek(HYBRID_HEADER_SIZE)
+                    buf = bytearray(COPY_BUFFER_SIZE)
+                    view = memoryview(buf)
+                    while n := f_in.readinto(buf):
+                        chunk = view[:n]
+                        checksum.update(chunk)
+                        f_out.write(chunk)
+                
+                # 整合性検証
+                actual_value = checksum.hexdigest()
+                expected_value = header_info.get(header_key, '')
+                
+                if actual_value != expected_value:
+                    logger.log_error(
+                        f"{label}不一致: 期待値={expected_value}, 実際={actual_value}",
+                        _dat_name(dat_file)
+                    )
+                    os.remove(temp_file)
+                    return False
+                
+                # 検証に成功した場合のみ復元ファイルとして配置
+                os.replace(temp_file, output_file)
+            except Exception:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+                raise
         
         return True
         
     except Exception as e:
-        logger.log_exception(e, dat_file, "バイナリ抽出失敗")
+        logger.log_exception(e, _dat_name(dat_file), "バイナリ抽出失敗")
         return False
@@ -4,8 +4,11 @@
 """
 import os
 import configparser
+import threading
+import time
+import weakref
 from datetime import datetime
-from error_def import ERROR_MESSAGES, DEFAULT_LANGUAGE
+from error_def import ERROR_MESSAGES_JA, ERROR_MESSAGES_EN, DEFAULT_LANGUAGE
 
 
 def _get_language_from_config():
@@ -31,6 +34,67 @@ def _get_language_from_config():
     return DEFAULT_LANGUAGE
 
 
+# ログ言語（モジュール読み込み時に一度だけconfig.iniから取得）
+_LANGUAGE = _get_language_from_config()
+
+
+def set_language(language=None):
+    """
+    ログ言語を変更する（主にテスト用）
+    
+    Args:
+        language (str, optional): 言語コード ("ja" または "en")。
+            省略時はconfig.iniから再読み込みする
+    """
+    global _LANGUAGE
+    if language is None:
+        _LANGUAGE = _get_language_from_config()
+    else:
+        language = language.lower()
+        _LANGUAGE = language if language in ['ja', 'en'] else DEFAULT_LANGUAGE
+
+
+# 直近に生成したタイムスタンプ (UNIX秒, "[%Y-%m-%d %H:%M:%S]")
+_last_timestamp = (0, "")
+
+
+def _get_timestamp():
+    """
+    ログ用タイムスタンプ文字列を取得
+    
+    同じ秒の間は前回の文字列を再利用し、strftime の呼び出しを1秒に1回に抑える
+    
+    Returns:
+        str: "[YYYY-MM-DD HH:MM:SS]" 形式の文字列
+    """
+    global _last_timestamp
+    now = int(time.time())
+    cached = _last_timestamp
+    if cached[0] != now:
+        cached = (now, datetime.fromtimestamp(now).strftime("[%Y-%m-%d %H:%M:%S]"))
+        _last_timestamp = cached
+    return cached[1]
+
+
+# 言語別のログ書式 (対象プレフィックス, 詳細プレフィックス, 未定義エラー書式)
+_LOG_TEMPLATES = {
+    "ja": ("- 対象: ", "- 詳細: ", "未定義のエラー (ID: {})"),
+    "en": ("- Target: ", "- Details: ", "Undefined error (ID: {})"),
+}
+
+
+class _MessageTable(dict):
+    """エラーID : メッセージ の辞書。未定義のIDには未定義エラーのメッセージを返す"""
+    
+    def __init__(self, messages, undefined_format):
+        super().__init__(messages)
+        self._undefined_format = undefined_format
+    
+    def __missing__(self, error_id):
+        # 未定義のIDは辞書に追加しない（文字列IDなどで肥大化させない）
+        return self._undefined_format.format(error_id)
+
+
 class ErrorLogger:
     """エラーログ管理クラス"""
     
@@ -44,6 +108,48 @@ class ErrorLogger:
         log_dir = os.path.dirname(self.log_file)
         if log_dir and not os.path.exists(log_dir):
             os.makedirs(log_dir, exist_ok=True)
+        
+        # 言語依存の書式は生成時に一度だけ決定する
+        self.language = _LANGUAGE
+        self._target_prefix, self._details_prefix, self._undef_fmt = _LOG_TEMPLATES[self.language]
+        self._msgs = _MessageTable(
+            ERROR_MESSAGES_EN if self.language == "en" else ERROR_MESSAGES_JA,
+            self._undef_fmt,
+        )
+        self._join = " ".join
+        
+        # ログファイルは最初の書き込み時に開き、以降は開いたまま追記する
+        self._fp = None
+        self._finalizer = None
+        self._lock = threading.Lock()
+    
+    def _write(self, log_entry):
+        """
+        ログエントリをファイルに追記
+        
+        Args:
+            log_entry (str): 改行付きのログエントリ
+        """
+        try:
+            with self._lock:
+                if self._fp is None:
+                    # 行バッファリングで開き、1行ごとにディスクへ反映する
+                    self._fp = open(self.log_file, 'a', encoding='utf-8', buffering=1)
+                    # インスタンス破棄時・プロセス終了時に自動でクローズする
+                    self._finalizer = weakref.finalize(self, self._fp.close)
+                self._fp.write(log_entry)
+        except Exception as e:
+            # ログ記録自体が失敗した場合はコンソールに出力
+            print(f"エラーログの記録に失敗しました: {e}")
+            print(f"元のエラー: {log_entry.strip()}")
+    
+    def close(self):
+        """ログファイルを閉じる（次の書き込み時に再度開かれる）"""
+        with self._lock:
+            if self._fp is not None:
+                self._finalizer()
+                self._fp = None
+                self._finalizer = None
     
     def log_error(self, error_id, target_file=None, additional_info=None):
         """
@@ -54,48 +160,18 @@ class ErrorLogger:
             target_file (str, optional): エラーが発生した対象ファイル
             additional_info (str, optional): 追加情報
         """
-        # config.iniから言語設定を取得
-        language = _get_language_from_config()
-        
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # エラーIDからメッセージを取得
-        error_def = ERROR_MESSAGES.get(error_id)
-        if error_def:
-            # 指定言語のメッセージを取得（存在しない場合はデフォルト言語）
-            error_message = error_def.get(language) or error_def.get(DEFAULT_LANGUAGE)
-        else:
-            # 未定義のエラーID
-            if language == "en":
-                error_message = f"Undefined error (ID: {error_id})"
-            else:
-                error_message = f"未定義のエラー (ID: {error_id})"
-        
-        # ログエントリを構築
-        log_parts = [f"[{timestamp}]", f"[ID:{error_id}]", error_message]
+        # ログエントリを構築（未定義のIDは _MessageTable が未定義エラーのメッセージを返す）
+        log_parts = [_get_timestamp(), f"[ID:{error_id}]", self._msgs[error_id]]
         
         if target_file:
-            if language == "en":
-                log_parts.append(f"- Target: {target_file}")
-            else:
-                log_parts.append(f"- 対象: {target_file}")
+            log_parts.append(f"{self._target_prefix}{target_file}")
         
         if additional_info:
-            if language == "en":
-                log_parts.append(f"- Details: {additional_info}")
-            else:
-                log_parts.append(f"- 詳細: {additional_info}")
+            log_parts.append(f"{self._details_prefix}{additional_info}")
         
-        log_entry = " ".join(log_parts) + "\n"
+        log_entry = self._join(log_parts) + "\n"
         
-        try:
-            # 追記モードでログファイルに書き込み
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(log_entry)
-        except Exception as e:
-            # ログ記録自体が失敗した場合はコンソールに出力
-            print(f"エラーログの記録に失敗しました: {e}")
-            print(f"元のエラー: {log_entry.strip()}")
+        self._write(log_entry)
     
     def log_exception(self, exception, target_file=None, context=""):
         """
@@ -106,16 +182,11 @@ class ErrorLogger:
             target_file (str, optional): エラーが発生した対象ファイル
             context (str, optional): エラーのコンテキスト情報
         """
-        # config.iniから言語設定を取得
-        language = _get_language_from_config()
-        
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
         # 例外情報を構築
         exception_info = f"{type(exception).__name__}: {str(exception)}"
         
         # ログエントリを構築
-        log_parts = [f"[{timestamp}]", "[EXCEPTION]"]
+        log_parts = [_get_timestamp(), "[EXCEPTION]"]
         
         if context:
             log_parts.append(f"{context} -")
@@ -123,21 +194,11 @@ class ErrorLogger:
         log_parts.append(exception_info)
         
         if target_file:
-            if language == "en":
-                log_parts.append(f"- Target: {target_file}")
-            else:
-                log_parts.append(f"- 対象: {target_file}")
+            log_parts.append(f"{self._target_prefix}{target_file}")
         
-        log_entry = " ".join(log_parts) + "\n"
+        log_entry = self._join(log_parts) + "\n"
         
-        try:
-            # 追記モードでログファイルに書き込み
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(log_entry)
-        except Exception as e:
-            # ログ記録自体が失敗した場合はコンソールに出力
-            print(f"エラーログの記録に失敗しました: {e}")
-            print(f"元のエラー: {log_entry.strip()}")
+        self._write(log_entry)
 
 
 # グローバルインスタンス（シングルトンパターン）
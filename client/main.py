@@ -4,16 +4,76 @@ DiscordImageSync クライアント
 """
 import sys
 import os
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from config_loader import load_config, ConfigValidationError
-from hybrid_converter import convert_to_hybrid
 from logger import get_logger
 
 
+# ディレクトリパス
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGES_DIR = os.path.join(SCRIPT_DIR, "images")
+OUTPUT_DIR = os.path.join(SCRIPT_DIR, "images_out")  # 走査対象外となるよう images の外に配置
+
+# 変換プロセス数の上限（Windows の ProcessPoolExecutor は61プロセスまで）
+MAX_WORKERS = 61 if sys.platform == 'win32' else None
+
+# 実行ログ（ファイルごとの変換結果を記録）
+RUN_LOG_FILE = "run.log"
+RUN_LOG_BUFFER_SIZE = 1 << 20  # 実行ログの書き込みバッファサイズ（1MB）
+
+# 区切り線
+BAR = "=" * 70
+
+log = logging.getLogger("discord_sync")
+
+
+class _BufferedFileHandler(logging.FileHandler):
+    """
+    書き込みをバッファリングするFileHandler
+    
+    レコードごとのflushを行わず、バッファが溢れた時とclose時にまとめて書き込む
+    """
+    
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=RUN_LOG_BUFFER_SIZE,
+                    encoding=self.encoding, errors=self.errors)
+    
+    def flush(self):
+        pass
+
+
+def setup_logging(verbose=False):
+    """
+    実行ログの出力先を設定
+    
+    ファイル（run.log）にはINFO以上を、コンソール（stderr）には
+    WARNING以上（verbose指定時はINFO以上）を出力する
+    
+    Args:
+        verbose (bool): コンソールにもINFOレベルを出力する場合True
+    """
+    formatter = logging.Formatter("[%(asctime)s] %(levelname)s %(message)s", "%Y-%m-%d %H:%M:%S")
+    
+    file_handler = _BufferedFileHandler(RUN_LOG_FILE, encoding="utf-8", delay=True)
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(formatter)
+    
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setLevel(logging.INFO if verbose else logging.WARNING)
+    console_handler.setFormatter(logging.Formatter("   %(message)s"))
+    
+    log.setLevel(logging.INFO)
+    log.addHandler(file_handler)
+    log.addHandler(console_handler)
+
+
 def display_config(config):
     """設定内容をCLIに表示"""
-    print("=" * 70)
+    print(BAR)
     print("DiscordImageSync クライアント - 設定情報")
-    print("=" * 70)
+    print(BAR)
     print()
     
     # 設定ファイルパス
@@ -50,8 +110,9 @@ def display_config(config):
     
     # ファイル設定
     print("📁 [Files] ファイル設定")
-    print(f"   対応拡張子:       {', '.join(config.supported_extensions)}")
-    print(f"   転送データ拡張子: {config.data_file_extension}")
+    print(f"   対応拡張子:         {', '.join(config.supported_extensions_display)}")
+    print(f"   転送データ拡張子:   {config.data_file_extension}")
+    print(f"   整合性チェック方式: {config.integrity}")
     print()
     
     # シャドウディレクトリ設定
@@ -61,12 +122,152 @@ def display_config(config):
     print(f"   ハッシュディレクトリ: {config.hash_dir_name}")
     print()
     
-    print("=" * 70)
+    print(BAR)
+
+
+def _iter_images(images_dir, exts, skip_dirs=()):
+    """
+    ディレクトリ以下の画像ファイルを列挙する
+    
+    os.scandir のエントリ情報を利用し、ファイルごとの stat 呼び出しを行わない
+    読み込めないディレクトリはエラーログに記録してスキップする
+    
+    Args:
+        images_dir (str): 検索対象のルートディレクトリ
+        exts: 対象とする拡張子（小文字、ドット付き）の集合
+        skip_dirs: 除外するディレクトリ名の集合
+    
+    Yields:
+        tuple: (os.DirEntry, ルートからの相対パス)
+    """
+    # (ディレクトリパス, ルートからの相対パス) のスタック
+    stack = [(images_dir, "")]
+    while stack:
+        dir_path, rel_root = stack.pop()
+        prefix = rel_root + os.sep if rel_root else ""
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in skip_dirs:
+                            stack.append((entry.path, prefix + entry.name))
+                    elif entry.is_file():
+                        # 拡張子チェック（splitext のタプル生成を避けて末尾の "." 以降を切り出す）
+                        # splitext と同様に ".png" / "..png" のように最後の "." より前が
+                        # ドットのみの名前（ドットファイル）は拡張子なしとする
+                        name = entry.name
+                        dot = name.rfind('.')
+                        if dot > 0 and (name[0] != '.' or name[:dot].lstrip('.')) \
+                                and name[dot:].lower() in exts:
+                            yield entry, prefix + name
+        except OSError as e:
+            # os.walk と同様に読み込めないディレクトリは処理を中断せずスキップする
+            get_logger().log_exception(e, dir_path, "ディレクトリの読み込み失敗")
+            log.warning("読み込めないディレクトリをスキップ: %s", dir_path)
+
+
+def _hash_cache_path(hash_dir, rel_path):
+    """
+    変換結果キャッシュのファイルパスを取得
+    
+    Args:
+        hash_dir (str): ハッシュ管理ディレクトリ
+        rel_path (str): 画像ファイルの相対パス
+    
+    Returns:
+        str: 相対パスから求めたキャッシュファイルのパス（画像ファイルごとに1つ）
+    """
+    return os.path.join(hash_dir, hashlib.sha1(rel_path.encode('utf-8')).hexdigest() + ".txt")
+
+
+def _cache_stamp(st, integrity):
+    """
+    キャッシュファイルに記録する変換条件（元ファイルの状態と整合性チェック方式）を取得
+    
+    Args:
+        st (os.stat_result): 画像ファイルの stat 結果
+        integrity (str): 整合性チェック方式
+    
+    Returns:
+        str: "整合性チェック方式:更新時刻:サイズ:"
+    """
+    return f"{integrity}:{st.st_mtime_ns}:{st.st_size}:"
+
+
+def _is_converted(cache_file, output_file, stamp, expected_size):
+    """
+    画像ファイルが変換済みかどうかを判定
+    
+    キャッシュファイルに記録された変換条件（整合性チェック方式・更新時刻・サイズ）が一致し、
+    出力ファイルのサイズが「ヘッダー + 元ファイル」と一致する場合に変換済みとみなす
+    
+    Args:
+        cache_file (str): キャッシュファイルのパス
+        output_file (str): 変換後の.datファイルのパス
+        stamp (str): _cache_stamp() で求めた現在の変換条件
+        expected_size (int): 変換後の.datファイルの想定サイズ（バイト）
+    
+    Returns:
+        bool: 変換済みの場合True
+    """
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            if not f.read().startswith(stamp):
+                return False
+        return os.stat(output_file).st_size == expected_size
+    except OSError:
+        return False
+
+
+def _write_hash_cache(cache_file, stamp, checksum):
+    """
+    変換結果のチェックサム（SHA-256 または CRC32C）をキャッシュファイルに記録
+    
+    内容は "整合性チェック方式:更新時刻:サイズ:チェックサム" の1行で、
+    同じ画像ファイルのキャッシュは上書きする
+    
+    Args:
+        cache_file (str): キャッシュファイルのパス
+        stamp (str): _cache_stamp() で求めた変換時の変換条件
+        checksum (str): 変換後の.datファイルのヘッダーに記録したチェックサム
+    """
+    logger = get_logger()
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            f.write(stamp + checksum)
+    except Exception as e:
+        logger.log_exception(e, cache_file, "ハッシュキャッシュの書き込み失敗")
+
+
+def _fsync_dirs(dirs):
+    """
+    ディレクトリのメタデータ（作成したファイルのエントリ）をまとめてディスクへ反映
+    
+    ファイルごとの fsync は行わず、実行の最後にディレクトリ単位で1回ずつ行う。
+    ディレクトリを開けない環境（Windows）では何もしない
+    
+    Args:
+        dirs: 対象ディレクトリのパスの集合
+    """
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    
+    logger = get_logger()
+    for dir_path in dirs:
+        try:
+            fd = os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logger.log_exception(e, dir_path, "ディレクトリの fsync 失敗")
 
 
 def process_images(config):
     """
-    client/images内の画像ファイルをHybrid形式に変換してclient/images/outに出力
+    client/images内の画像ファイルをHybrid形式に変換してclient/images_outに出力
     
     Args:
         config: 設定オブジェクト
@@ -77,9 +278,8 @@ def process_images(config):
     logger = get_logger()
     
     # ディレクトリパス設定
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    images_dir = os.path.join(script_dir, "images")
-    output_dir = os.path.join(images_dir, "out")
+    images_dir = IMAGES_DIR
+    output_dir = OUTPUT_DIR
     
     # 統計情報
     stats = {
@@ -94,44 +294,94 @@ def process_images(config):
         print(f"⚠️  {images_dir} が存在しません")
         return stats
     
-    # 画像ファイルを検索
-    for root, dirs, files in os.walk(images_dir):
-        # outディレクトリは除外
-        if "out" in dirs:
-            dirs.remove("out")
+    # 変換モジュールは処理対象がある場合にのみ読み込む
+    from hybrid_converter import convert_to_hybrid_checksum, HYBRID_HEADER_SIZE
+    
+    # 変換済みファイルのハッシュキャッシュ
+    hash_dir = os.path.join(images_dir, config.shadow_dir_name, config.hash_dir_name)
+    
+    # 画像ファイルを検索（シャドウディレクトリは除外）
+    skip_dirs = {config.shadow_dir_name}
+    sources = []
+    output_count = {}
+    for entry, rel_path in _iter_images(images_dir, config.supported_extensions, skip_dirs):
+        stats["total"] += 1
         
-        for filename in files:
-            # 拡張子チェック
-            _, ext = os.path.splitext(filename)
-            if ext.lower() not in config.supported_extensions:
-                continue
-            
-            stats["total"] += 1
-            
-            # 入力ファイルパス
-            input_file = os.path.join(root, filename)
-            
-            # 出力ファイルパス（相対パス構造を維持）
-            rel_path = os.path.relpath(input_file, images_dir)
-            output_basename = os.path.splitext(rel_path)[0] + config.data_file_extension
-            output_file = os.path.join(output_dir, output_basename)
-            
-            # 変換処理
-            print(f"🔄 変換中: {rel_path}")
-            success = convert_to_hybrid(input_file, output_file, images_dir)
+        # 出力ファイルパス（相対パス構造を維持）
+        output_basename = os.path.splitext(rel_path)[0] + config.data_file_extension
+        output_file = os.path.join(output_dir, output_basename)
+        sources.append((entry, rel_path, output_basename, output_file))
+        output_count[output_file] = output_count.get(output_file, 0) + 1
+    
+    jobs = []
+    for entry, rel_path, output_basename, output_file in sources:
+        input_file = entry.path
+        
+        # 拡張子のみ異なるファイル（a.png と a.jpg 等）は同じ出力ファイルになるため変換しない
+        if output_count[output_file] > 1:
+            logger.log_error(f"出力ファイル名が他の画像ファイルと重複しています: {output_basename}", input_file)
+            stats["failed"] += 1
+            log.warning("失敗: %s", rel_path)
+            continue
+        
+        # 走査後に削除されたファイル等はそのファイルのみ失敗とする
+        try:
+            st = entry.stat()
+        except OSError as e:
+            logger.log_exception(e, input_file, "ファイル情報の取得失敗")
+            stats["failed"] += 1
+            log.warning("失敗: %s", rel_path)
+            continue
+        
+        # 前回から変更のないファイルはスキップ（整合性チェック方式の変更時は再変換する）
+        cache_file = _hash_cache_path(hash_dir, rel_path)
+        stamp = _cache_stamp(st, config.integrity)
+        if _is_converted(cache_file, output_file, stamp, HYBRID_HEADER_SIZE + st.st_size):
+            stats["skipped"] += 1
+            continue
+        
+        jobs.append((input_file, output_file, rel_path, output_basename, cache_file, stamp))
+    
+    if not jobs:
+        return stats
+    
+    # 変換処理（ファイルごとに独立しているためプロセスプールで並列実行）
+    print(f"🔄 変換中: {len(jobs)}ファイル")
+    max_workers = min(len(jobs), os.cpu_count() or 1, MAX_WORKERS or len(jobs))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(convert_to_hybrid_checksum, job[0], job[1], images_dir, config.integrity): job
+            for job in jobs
+        }
+        
+        # 出力ファイルを作成したディレクトリ（最後にまとめて fsync する）
+        written_dirs = set()
+        for future in as_completed(futures):
+            _, output_file, rel_path, output_basename, cache_file, stamp = futures[future]
+            try:
+                checksum = future.result()
+            except Exception as e:
+                logger.log_exception(e, rel_path, "変換プロセスの実行失敗")
+                checksum = None
             
-            if success:
+            if checksum is not None:
                 stats["success"] += 1
-                print(f"   ✅ 成功: {output_basename}")
+                _write_hash_cache(cache_file, stamp, checksum)
+                written_dirs.add(os.path.dirname(output_file))
+                log.info("成功: %s", output_basename)
             else:
                 stats["failed"] += 1
-                print(f"   ❌ 失敗: {rel_path}")
+                log.warning("失敗: %s", rel_path)
+    
+    _fsync_dirs(written_dirs)
     
     return stats
 
 
 def main():
     """メイン処理"""
+    setup_logging(verbose=any(arg in ("-v", "--verbose") for arg in sys.argv[1:]))
+    
     try:
         # 設定ファイルの読み込み
         print("設定ファイルを読み込んでいます...")
@@ -143,37 +393,39 @@ def main():
         display_config(config)
         
         # 画像ファイル変換処理
-        print("\n" + "=" * 70)
+        print("\n" + BAR)
         print("🖼️  画像ファイル変換処理を開始します")
-        print("=" * 70)
+        print(BAR)
         print()
         
         stats = process_images(config)
         
         # 処理結果サマリー
         print()
-        print("=" * 70)
+        print(BAR)
         print("📊 処理結果サマリー")
-        print("=" * 70)
+        print(BAR)
         print(f"   総ファイル数: {stats['total']}")
         print(f"   成功: {stats['success']}")
         print(f"   失敗: {stats['failed']}")
         print(f"   スキップ: {stats['skipped']}")
-        print("=" * 70)
+        print(BAR)
         
         if stats['failed'] > 0:
             print("\n⚠️  エラーの詳細は error.log を確認してください")
         
-    except ConfigValidationError as e:
-        print("❌ 設定エラー:", str(e), file=sys.stderr)
-        sys.exit(1)
-    except FileNotFoundError as e:
-        print("❌ ファイルが見つかりません:", str(e), file=sys.stderr)
-        sys.exit(1)
     except Exception as e:
-        print("❌ 予期しないエラーが発生しました:", str(e), file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+        if isinstance(e, ConfigValidationError):
+            print("❌ 設定エラー:", str(e), file=sys.stderr)
+        elif isinstance(e, FileNotFoundError):
+            print("❌ ファイルが見つかりません:", str(e), file=sys.stderr)
+        else:
+            print("❌ 予期しないエラーが発生しました:", str(e), file=sys.stderr)
+            import traceback
+            traceback.print_exc()
+        
+        # エラーログにも記録する
+        get_logger().log_exception(e, context="メイン処理")
         sys.exit(1)
 
 
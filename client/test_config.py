@@ -0,0 +1,266 @@
+"""
+config_loader.py 単体テストスクリプト
+Configクラスの遅延読み込みと検証をテスト
+"""
+import configparser
+import os
+import sys
+from config_loader import Config, ConfigValidationError, _parse_path_ini
+
+
+# テスト用設定ファイル
+TEST_CONFIG_FILE = "test_config.ini"
+
+# テスト用設定ファイルの内容（{transfer} / {files} に各セクションの追加行を埋め込む）
+TEST_CONFIG_TEMPLATE = """\
+[Server]
+websocket_url = ws://localhost:8765
+
+[Sync.Test]
+enabled = true
+server_id = 1
+channel_id = 2
+local_path = ./shared/test
+
+[Transfer]
+{transfer}
+
+[Files]
+supported_extensions = .jpg,.png
+{files}
+
+[Shadow]
+shadow_dir_name = .shadow
+"""
+
+# path.ini の解析テストケース : (説明, path.ini の内容)
+PATH_INI_CASES = [
+    ("キー名の大文字・小文字", "[Path]\nConfig_File = x.ini\n"),
+    ("区切り文字 ':'", "[Path]\nconfig_file: ../private/config.ini\n"),
+    ("前後の空白", "[Path]\n  config_file   =   D:/secure/config.ini  \n"),
+    ("他のセクションの後", "[Other]\nkey = 1\n\n[Path]\nconfig_file = a.ini\n"),
+]
+
+# path.ini の解析でエラーとなるテストケース : (説明, path.ini の内容)
+PATH_INI_ERROR_CASES = [
+    ("[Path] セクションなし", "[Other]\nconfig_file = a.ini\n"),
+    ("config_file が他のセクション", "[Path]\nother = 1\n\n[Other]\nconfig_file = a.ini\n"),
+    ("config_file が空", "[Path]\nconfig_file =\n"),
+]
+
+# 区切り線
+BAR = "=" * 70
+SUB = "-" * 70
+
+
+def write_test_config(transfer="", files=""):
+    """
+    テスト用設定ファイルを作成
+    
+    Args:
+        transfer (str): [Transfer] セクションの本文
+        files (str): [Files] セクションに追加する行
+    
+    Returns:
+        str: 作成した設定ファイルのパス
+    """
+    with open(TEST_CONFIG_FILE, 'w', encoding='utf-8') as f:
+        f.write(TEST_CONFIG_TEMPLATE.format(transfer=transfer, files=files))
+    return TEST_CONFIG_FILE
+
+
+def test_lazy_load():
+    """遅延読み込みのテスト"""
+    print(BAR)
+    print("📋 テスト1: 遅延読み込み")
+    print(BAR)
+    
+    config = Config(write_test_config("max_file_size_mb = 8"))
+    
+    try:
+        # [Sync.*] は読み込み時に取得済み
+        sync = config.sync_servers['Test']
+        assert (sync.enabled, sync.server_id, sync.channel_id, sync.local_path) == \
+            (True, '1', '2', './shared/test'), "[Sync.Test] の値が不正です"
+        print("✅ [Sync.Test] の値を取得")
+        
+        # 未アクセスのセクションは読み込まれていない
+        assert 'max_file_size_mb' not in config.__dict__, "アクセス前に読み込まれています"
+        print("✅ アクセス前は未読み込み")
+        
+        assert config.max_file_size_mb == 8, f"max_file_size_mb が不正: {config.max_file_size_mb}"
+        assert config.send_interval_sec == 30, f"send_interval_sec のデフォルト値が不正: {config.send_interval_sec}"
+        print("✅ [Transfer] の値とデフォルト値を取得")
+        
+        assert config.supported_extensions == frozenset({'.jpg', '.png'}), \
+            f"supported_extensions が不正: {config.supported_extensions}"
+        print("✅ [Files] の値を取得")
+        
+        assert config.integrity == 'sha256', f"integrity のデフォルト値が不正: {config.integrity}"
+        print("✅ integrity のデフォルト値は sha256")
+        
+        return True
+    except AssertionError as e:
+        print(f"❌ テスト失敗: {e}")
+        return False
+
+
+def test_validation_error_repeats():
+    """検証エラー後の再アクセスのテスト"""
+    print("\n" + BAR)
+    print("📋 テスト2: 検証エラー後の再アクセス")
+    print(BAR)
+    
+    config = Config(write_test_config("max_file_size_mb = -1"))
+    
+    try:
+        # 1回目・2回目とも検証エラーとなり、同じセクションの他の属性も取得できない
+        for name in ('max_file_size_mb', 'max_file_size_mb', 'send_interval_sec', 'packet_timeout_sec'):
+            try:
+                value = getattr(config, name)
+            except ConfigValidationError:
+                print(f"✅ {name}: ConfigValidationError")
+                continue
+            raise AssertionError(f"{name} が検証エラーにならず取得できました: {value}")
+        
+        return True
+    except AssertionError as e:
+        print(f"❌ テスト失敗: {e}")
+        return False
+
+
+def test_integrity_option():
+    """整合性チェック方式の設定のテスト"""
+    print("\n" + BAR)
+    print("📋 テスト3: 整合性チェック方式の設定")
+    print(BAR)
+    
+    try:
+        config = Config(write_test_config(files="integrity = SHA256"))
+        assert config.integrity == 'sha256', f"integrity が不正: {config.integrity}"
+        print("✅ 大文字で指定しても sha256 として読み込み")
+        
+        config = Config(write_test_config(files="integrity = md5"))
+        try:
+            value = config.integrity
+        except ConfigValidationError:
+            print("✅ 不明な方式は ConfigValidationError")
+        else:
+            raise AssertionError(f"不明な方式が検証エラーになりませんでした: {value}")
+        
+        return True
+    except AssertionError as e:
+        print(f"❌ テスト失敗: {e}")
+        return False
+
+
+def _configparser_path(text):
+    """
+    ConfigParser で path.ini を解析した場合の config_file の値を取得（比較用）
+    
+    Args:
+        text (str): path.ini の内容
+    
+    Returns:
+        str: config_file の値（取得できない場合は空文字列）
+    """
+    parser = configparser.ConfigParser()
+    parser.read_string(text)
+    if 'Path' not in parser:
+        return ''
+    return parser['Path'].get('config_file', '')
+
+
+def test_parse_path_ini():
+    """path.ini の解析のテスト（ConfigParser と同じ結果になること）"""
+    print("\n" + BAR)
+    print("📋 テスト4: path.ini の解析")
+    print(BAR)
+    
+    try:
+        # 同梱の path.ini.example
+        example = os.path.join(os.path.dirname(os.path.abspath(__file__)), "path.ini.example")
+        with open(example, 'r', encoding='utf-8') as f:
+            cases = [("path.ini.example", f.read())] + PATH_INI_CASES
+        
+        for description, text in cases:
+            expected = _configparser_path(text)
+            try:
+                actual = _parse_path_ini(text)
+            except ConfigValidationError as e:
+                raise AssertionError(f"{description}: {e}")
+            assert actual == expected, f"{description}: {actual!r} (期待値: {expected!r})"
+            print(f"✅ {description}: {actual}")
+        
+        for description, text in PATH_INI_ERROR_CASES:
+            assert not _configparser_path(text), f"{description}: テストケースが不正です"
+            try:
+                value = _parse_path_ini(text)
+            except ConfigValidationError:
+                print(f"✅ {description}: ConfigValidationError")
+                continue
+            raise AssertionError(f"{description}: 検証エラーにならず取得できました: {value}")
+        
+        return True
+    except AssertionError as e:
+        print(f"❌ テスト失敗: {e}")
+        return False
+
+
+def cleanup():
+    """テストファイルのクリーンアップ"""
+    print("\n" + BAR)
+    print("🧹 クリーンアップ")
+    print(BAR)
+    
+    if os.path.exists(TEST_CONFIG_FILE):
+        os.remove(TEST_CONFIG_FILE)
+        print(f"✅ テスト用設定ファイルを削除: {TEST_CONFIG_FILE}")
+
+
+def main():
+    """メイン処理"""
+    print(BAR)
+    print("🧪 Config 単体テスト")
+    print(BAR)
+    print()
+    
+    # テスト結果を記録
+    results = []
+    
+    # 各テストを実行
+    results.append(("遅延読み込み", test_lazy_load()))
+    results.append(("検証エラー後の再アクセス", test_validation_error_repeats()))
+    results.append(("整合性チェック方式の設定", test_integrity_option()))
+    results.append(("path.ini の解析", test_parse_path_ini()))
+    
+    # テスト結果サマリー
+    print("\n" + BAR)
+    print("📊 テスト結果サマリー")
+    print(BAR)
+    
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    
+    for test_name, result in results:
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"   {status}  {test_name}")
+    
+    print(SUB)
+    print(f"   合計: {passed}/{total} テスト成功")
+    print(BAR)
+    
+    # クリーンアップ
+    cleanup()
+    
+    # 終了ステータス
+    if passed == total:
+        print("\n🎉 すべてのテストに成功しました！")
+        sys.exit(0)
+    else:
+        print(f"\n⚠️  {total - passed}件のテストが失敗しました")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+hybrid_converter.py 単体テストスクリプト
+画像ファイル → .dat → 画像ファイルの往復変換を整合性チェック方式ごとにテスト
+"""
+import os
+import shutil
+import sys
+from hybrid_converter import (
+    convert_to_hybrid, parse_hybrid_header, extract_binary_from_hybrid,
+    google_crc32c, INTEGRITY_SHA256, INTEGRITY_CRC32C,
+)
+
+
+# テスト用ディレクトリ
+TEST_DIR = "test_converter_work"
+
+# テスト用画像ファイルのサイズ（コピーバッファ 1MB を跨ぐサイズ）
+TEST_FILE_SIZE = (1 << 20) + 12345
+
+# 区切り線
+BAR = "=" * 70
+SUB = "-" * 70
+
+
+def round_trip(integrity, header_key, digest_length):
+    """
+    指定した整合性チェック方式で往復変換を行い、結果を検証
+    
+    Args:
+        integrity (str): 整合性チェック方式
+        header_key (str): ヘッダーに記録されるチェックサムのキー名
+        digest_length (int): チェックサム（16進）の文字数
+    
+    Returns:
+        bool: テスト成功時True
+    """
+    os.makedirs(TEST_DIR, exist_ok=True)
+    source_file = os.path.join(TEST_DIR, f"{integrity}.png")
+    dat_file = os.path.join(TEST_DIR, f"{integrity}.dat")
+    restored_file = os.path.join(TEST_DIR, f"{integrity}_restored.png")
+    
+    data = os.urandom(TEST_FILE_SIZE)
+    with open(source_file, 'wb') as f:
+        f.write(data)
+    
+    try:
+        assert convert_to_hybrid(source_file, dat_file, TEST_DIR, integrity), "変換に失敗しました"
+        print("✅ 変換成功")
+        
+        header_info = parse_hybrid_header(dat_file)
+        assert header_info, "ヘッダー解析に失敗しました"
+        assert len(header_info.get(header_key, '')) == digest_length, \
+            f"ヘッダーの {header_key} が不正: {header_info.get(header_key)}"
+        print(f"✅ ヘッダーに {header_key} を記録: {header_info[header_key]}")
+        
+        assert extract_binary_from_hybrid(dat_file, restored_file), "復元に失敗しました"
+        with open(restored_file, 'rb') as f:
+            assert f.read() == data, "復元したファイルの内容が一致しません"
+        print("✅ 復元したファイルが元ファイルと一致")
+        
+        # バイナリ部を1バイト書き換えると検証に失敗する
+        with open(dat_file, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 0xFF]))
+        assert not extract_binary_from_hybrid(dat_file, restored_file + ".bad"), "改ざんを検出できませんでした"
+        assert not os.path.exists(restored_file + ".bad"), "検証失敗時に復元ファイルが残っています"
+        print("✅ 改ざんしたファイルは検証に失敗")
+        
+        return True
+    except AssertionError as e:
+        print(f"❌ テスト失敗: {e}")
+        return False
+
+
+def test_sha256_round_trip():
+    """SHA-256 モードの往復変換テスト"""
+    print(BAR)
+    print("📋 テスト1: SHA-256 往復変換")
+    print(BAR)
+    
+    return round_trip(INTEGRITY_SHA256, 'SHA256', 64)
+
+
+def test_crc32c_round_trip():
+    """CRC32C モードの往復変換テスト"""
+    print("\n" + BAR)
+    print("📋 テスト2: CRC32C 往復変換")
+    print(BAR)
+    
+    if google_crc32c is None:
+        print("⏭️  google-crc32c が未インストールのためスキップ")
+        return True
+    
+    return round_trip(INTEGRITY_CRC32C, 'CRC32C', 8)
+
+
+def cleanup():
+    """テストファイルのクリーンアップ"""
+    print("\n" + BAR)
+    print("🧹 クリーンアップ")
+    print(BAR)
+    
+    if os.path.exists(TEST_DIR):
+        shutil.rmtree(TEST_DIR)
+        print(f"✅ テスト用ディレクトリを削除: {TEST_DIR}")
+
+
+def main():
+    """メイン処理"""
+    print(BAR)
+    print("🧪 Hybrid変換 単体テスト")
+    print(BAR)
+    print()
+    
+    # テスト結果を記録
+    results = []
+    
+    # 各テストを実行
+    results.append(("SHA-256 往復変換", test_sha256_round_trip()))
+    results.append(("CRC32C 往復変換", test_crc32c_round_trip()))
+    
+    # テスト結果サマリー
+    print("\n" + BAR)
+    print("📊 テスト結果サマリー")
+    print(BAR)
+    
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    
+    for test_name, result in results:
+        status = "✅ PASS" if result else "❌ FAIL"
+        print(f"   {status}  {test_name}")
+    
+    print(SUB)
+    print(f"   合計: {passed}/{total} テスト成功")
+    print(BAR)
+    
+    # クリーンアップ
+    cleanup()
+    
+    # 終了ステータス
+    if passed == total:
+        print("\n🎉 すべてのテストに成功しました！")
+        sys.exit(0)
+    else:
+        print(f"\n⚠️  {total - passed}件のテストが失敗しました")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
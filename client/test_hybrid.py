@@ -1,12 +1,25 @@
 """
 Hybrid形式 動作確認スクリプト
-.datファイルのヘッダー解析、SHA-256検証、バイナリ抽出をテスト
+.datファイルのヘッダー解析、整合性検証（SHA-256 / CRC32C）、バイナリ抽出をテスト
 """
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from hybrid_converter import parse_hybrid_header, extract_binary_from_hybrid
 
 
+# デフォルトのテスト対象ディレクトリ
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TEST_DIR = os.path.join(SCRIPT_DIR, "images_out")
+
+# .datファイル検索時の走査スレッド数
+SCAN_WORKERS = 32
+
+# 区切り線
+BAR = "=" * 70
+SUB = "-" * 70
+
+
 def test_hybrid_file(dat_file):
     """
     .datファイルのテスト
@@ -14,66 +27,156 @@ def test_hybrid_file(dat_file):
     Args:
         dat_file (str): テスト対象の.datファイルパス
     """
-    print("=" * 70)
+    print(BAR)
     print(f"📋 テスト対象: {dat_file}")
-    print("=" * 70)
+    print(BAR)
     print()
     
-    # ファイル存在チェック
-    if not os.path.exists(dat_file):
+    # ファイルを一度だけ開き、サイズ取得・ヘッダー解析・バイナリ抽出で使い回す
+    try:
+        f = open(dat_file, 'rb')
+    except FileNotFoundError:
         print(f"❌ ファイルが見つかりません: {dat_file}")
         return False
     
-    # ファイルサイズ表示
-    file_size = os.path.getsize(dat_file)
-    print(f"📦 ファイルサイズ: {file_size:,} バイト ({file_size / 1024 / 1024:.2f} MB)")
-    print()
+    with f:
+        file_size = os.fstat(f.fileno()).st_size
+        
+        # ファイルサイズ表示
+        print(f"📦 ファイルサイズ: {file_size:,} バイト ({file_size / 1024 / 1024:.2f} MB)")
+        print()
+        
+        # 1. ヘッダー解析テスト
+        print("🔍 ステップ1: ヘッダー解析")
+        print(SUB)
+        header_info = parse_hybrid_header(f)
+        
+        if not header_info:
+            print("❌ ヘッダー解析に失敗しました")
+            return False
+        
+        print("✅ ヘッダー解析成功")
+        print()
+        for key, value in header_info.items():
+            print(f"   {key}: {value}")
+        print()
+        
+        # 2. バイナリ抽出テスト
+        print("🔍 ステップ2: バイナリ抽出と整合性検証（SHA-256 / CRC32C）")
+        print(SUB)
+        
+        # 出力ファイル名生成（元のファイル名を使用）
+        original_path = header_info.get('Path', 'unknown.jpg')
+        test_output_dir = os.path.join(os.path.dirname(dat_file), "test_restored")
+        test_output_file = os.path.join(test_output_dir, os.path.basename(original_path))
+        
+        # バイナリ抽出
+        success = extract_binary_from_hybrid(f, test_output_file)
+        
+        if success:
+            print(f"✅ バイナリ抽出成功")
+            print(f"   復元ファイル: {test_output_file}")
+            restored_size = os.stat(test_output_file).st_size
+            expected_size = int(header_info.get('Size', 0))
+            print(f"   ファイルサイズ: {restored_size:,} バイト (期待値: {expected_size:,})")
+            
+            if restored_size == expected_size:
+                print("   ✅ サイズ一致")
+            else:
+                print("   ⚠️  サイズ不一致")
+            
+            print()
+            print("🎉 すべてのテストに成功しました！")
+            return True
+        else:
+            print("❌ バイナリ抽出に失敗しました")
+            return False
+
+
+def _scan_directory(path):
+    """
+    1ディレクトリ分のエントリを走査
     
-    # 1. ヘッダー解析テスト
-    print("🔍 ステップ1: ヘッダー解析")
-    print("-" * 70)
-    header_info = parse_hybrid_header(dat_file)
+    Args:
+        path (str): 走査するディレクトリ
     
-    if not header_info:
-        print("❌ ヘッダー解析に失敗しました")
-        return False
+    Returns:
+        tuple: (サブディレクトリのリスト, (.datファイルのパス, 重複判定キー) のリスト)
+               重複判定キーは (st_dev, st_ino)。取得できない場合は None
+    """
+    subdirs = []
+    files = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.endswith('.dat') and entry.is_file():
+                    files.append((entry.path, _file_key(entry.path)))
+    except OSError:
+        # os.walk と同様に読み込めないディレクトリは無視する
+        pass
+    return subdirs, files
+
+
+def _file_key(path):
+    """
+    同一ファイル判定用のキーを取得
     
-    print("✅ ヘッダー解析成功")
-    print()
-    for key, value in header_info.items():
-        print(f"   {key}: {value}")
-    print()
+    Windows の DirEntry.stat() は st_dev / st_ino を常に0とするため os.stat() を使用する
     
-    # 2. バイナリ抽出テスト
-    print("🔍 ステップ2: バイナリ抽出とSHA-256検証")
-    print("-" * 70)
+    Args:
+        path (str): 対象ファイルのパス
     
-    # 出力ファイル名生成（元のファイル名を使用）
-    original_path = header_info.get('Path', 'unknown.jpg')
-    test_output_dir = os.path.join(os.path.dirname(dat_file), "test_restored")
-    test_output_file = os.path.join(test_output_dir, os.path.basename(original_path))
+    Returns:
+        tuple or None: (st_dev, st_ino)。取得できない場合（st_ino が0の場合を含む）は None
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not st.st_ino:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+def find_dat_files(directory, max_workers=SCAN_WORKERS):
+    """
+    指定ディレクトリ以下の.datファイルを複数スレッドで検索
     
-    # バイナリ抽出
-    success = extract_binary_from_hybrid(dat_file, test_output_file)
+    ディレクトリごとの走査をスレッドプールに分散し、
+    ネットワークドライブ等での待ち時間を重ね合わせる
+    シンボリックリンクやハードリンクで同じファイルが複数見つかった場合は1つだけ返す
     
-    if success:
-        print(f"✅ バイナリ抽出成功")
-        print(f"   復元ファイル: {test_output_file}")
-        restored_size = os.path.getsize(test_output_file)
-        expected_size = int(header_info.get('Size', 0))
-        print(f"   ファイルサイズ: {restored_size:,} バイト (期待値: {expected_size:,})")
-        
-        if restored_size == expected_size:
-            print("   ✅ サイズ一致")
-        else:
-            print("   ⚠️  サイズ不一致")
-        
-        print()
-        print("🎉 すべてのテストに成功しました！")
-        return True
-    else:
-        print("❌ バイナリ抽出に失敗しました")
-        return False
+    Args:
+        directory (str): 検索対象ディレクトリ
+        max_workers (int): 走査スレッド数
+    
+    Returns:
+        list: 見つかった.datファイルのパス（ソート済み）
+    """
+    found = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(_scan_directory, directory)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                subdirs, files = future.result()
+                found.extend(files)
+                pending.update(executor.submit(_scan_directory, d) for d in subdirs)
+    
+    # パス順に並べ、同じ (st_dev, st_ino) の2件目以降は除外する
+    # （キーを取得できなかったファイルは重複判定せずすべて残す）
+    found.sort()
+    dat_files = []
+    seen = set()
+    for path, key in found:
+        if key is not None:
+            if key in seen:
+                continue
+            seen.add(key)
+        dat_files.append(path)
+    return dat_files
 
 
 def test_all_dat_files(directory):
@@ -83,16 +186,12 @@ def test_all_dat_files(directory):
     Args:
         directory (str): テスト対象ディレクトリ
     """
-    print("=" * 70)
+    print(BAR)
     print(f"📂 ディレクトリ: {directory}")
-    print("=" * 70)
+    print(BAR)
     print()
     
-    dat_files = []
-    for root, dirs, files in os.walk(directory):
-        for filename in files:
-            if filename.endswith('.dat'):
-                dat_files.append(os.path.join(root, filename))
+    dat_files = find_dat_files(directory)
     
     if not dat_files:
         print("⚠️  .datファイルが見つかりませんでした")
@@ -108,21 +207,17 @@ def test_all_dat_files(directory):
         print()
     
     # サマリー
-    print("=" * 70)
+    print(BAR)
     print("📊 テスト結果サマリー")
-    print("=" * 70)
+    print(BAR)
     print(f"   総ファイル数: {len(dat_files)}")
     print(f"   成功: {success_count}")
     print(f"   失敗: {len(dat_files) - success_count}")
-    print("=" * 70)
+    print(BAR)
 
 
 def main():
     """メイン処理"""
-    # デフォルトのテスト対象ディレクトリ
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    default_test_dir = os.path.join(script_dir, "images", "out")
-    
     if len(sys.argv) > 1:
         # 引数で.datファイルまたはディレクトリを指定
         target = sys.argv[1]
@@ -138,17 +233,17 @@ def main():
             sys.exit(1)
     else:
         # デフォルトディレクトリをテスト
-        if os.path.exists(default_test_dir):
-            test_all_dat_files(default_test_dir)
+        if os.path.exists(DEFAULT_TEST_DIR):
+            test_all_dat_files(DEFAULT_TEST_DIR)
         else:
-            print(f"❌ デフォルトディレクトリが見つかりません: {default_test_dir}")
+            print(f"❌ デフォルトディレクトリが見つかりません: {DEFAULT_TEST_DIR}")
             print()
             print("使用方法:")
             print(f"  python {os.path.basename(__file__)} [.datファイルまたはディレクトリ]")
             print()
             print("例:")
-            print(f"  python {os.path.basename(__file__)} images/out/sample.dat")
-            print(f"  python {os.path.basename(__file__)} images/out")
+            print(f"  python {os.path.basename(__file__)} images_out/sample.dat")
+            print(f"  python {os.path.basename(__file__)} images_out")
             sys.exit(1)
 
 
@@ -2,18 +2,46 @@
 logger.py 単体テストスクリプト
 ErrorLoggerクラスの各機能をテスト
 """
+import configparser
 import os
+import shutil
 import sys
 from datetime import datetime
-from logger import ErrorLogger, get_logger
-from error_def import ERROR_MESSAGES
+from logger import ErrorLogger, get_logger, set_language
+from error_def import ERROR_MESSAGES, ERROR_MESSAGES_JA, ERROR_MESSAGES_EN
+
+
+# ログファイル読み込み時のバッファサイズ
+LOG_READ_BUFFER_SIZE = 256 * 1024
+
+# 区切り線
+BAR = "=" * 70
+SUB = "-" * 70
+
+
+def tail_last_line(path, block_size=4096):
+    """
+    ファイルの最終行を取得（末尾のブロックのみ読み込む）
+    
+    Args:
+        path (str): 対象ファイルのパス
+        block_size (int): 末尾から読み込むバイト数
+    
+    Returns:
+        str: 最終行（改行なし）。空ファイルの場合は空文字列
+    """
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - block_size))
+        data = f.read()
+    return data.rstrip(b'\r\n').rpartition(b'\n')[2].decode('utf-8', errors='replace').strip()
 
 
 def test_logger_basic():
     """基本的なログ記録のテスト"""
-    print("=" * 70)
+    print(BAR)
     print("📋 テスト1: 基本的なログ記録")
-    print("=" * 70)
+    print(BAR)
     
     # テスト用ログファイル
     test_log_file = "test_error.log"
@@ -42,11 +70,11 @@ def test_logger_basic():
     if os.path.exists(test_log_file):
         print(f"\n✅ ログファイルが作成されました: {test_log_file}")
         print("\n📄 ログファイルの内容:")
-        print("-" * 70)
-        with open(test_log_file, 'r', encoding='utf-8') as f:
+        print(SUB)
+        with open(test_log_file, 'r', encoding='utf-8', buffering=LOG_READ_BUFFER_SIZE) as f:
             content = f.read()
             print(content)
-        print("-" * 70)
+        print(SUB)
         return True
     else:
         print(f"\n❌ ログファイルが作成されませんでした: {test_log_file}")
@@ -55,9 +83,9 @@ def test_logger_basic():
 
 def test_undefined_error_id():
     """未定義のエラーIDのテスト"""
-    print("\n" + "=" * 70)
+    print("\n" + BAR)
     print("📋 テスト2: 未定義のエラーID")
-    print("=" * 70)
+    print(BAR)
     
     test_log_file = "test_error.log"
     logger = ErrorLogger(test_log_file)
@@ -68,14 +96,13 @@ def test_undefined_error_id():
     
     # ログファイルの最終行を確認
     print("\n📄 ログファイルの最終行:")
-    print("-" * 70)
-    with open(test_log_file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        if lines:
-            print(lines[-1].strip())
-    print("-" * 70)
-    
-    if "未定義のエラー" in lines[-1]:
+    print(SUB)
+    last_line = tail_last_line(test_log_file)
+    if last_line:
+        print(last_line)
+    print(SUB)
+    
+    if "未定義のエラー" in last_line:
         print("✅ 未定義エラーの処理が正しく動作しています")
         return True
     else:
@@ -85,9 +112,9 @@ def test_undefined_error_id():
 
 def test_log_exception():
     """例外ログ記録のテスト"""
-    print("\n" + "=" * 70)
+    print("\n" + BAR)
     print("📋 テスト3: 例外ログ記録")
-    print("=" * 70)
+    print(BAR)
     
     test_log_file = "test_error.log"
     logger = ErrorLogger(test_log_file)
@@ -102,14 +129,13 @@ def test_log_exception():
     
     # ログファイルの最終行を確認
     print("\n📄 ログファイルの最終行:")
-    print("-" * 70)
-    with open(test_log_file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        if lines:
-            print(lines[-1].strip())
-    print("-" * 70)
-    
-    if "ZeroDivisionError" in lines[-1]:
+    print(SUB)
+    last_line = tail_last_line(test_log_file)
+    if last_line:
+        print(last_line)
+    print(SUB)
+    
+    if "ZeroDivisionError" in last_line:
         print("✅ 例外ログが正しく記録されました")
         return True
     else:
@@ -119,9 +145,9 @@ def test_log_exception():
 
 def test_global_logger():
     """グローバルロガーのテスト"""
-    print("\n" + "=" * 70)
+    print("\n" + BAR)
     print("📋 テスト4: グローバルロガー（シングルトン）")
-    print("=" * 70)
+    print(BAR)
     
     # グローバルロガーを取得
     logger1 = get_logger("test_error.log")
@@ -140,45 +166,52 @@ def test_global_logger():
 
 def test_all_error_messages():
     """全エラーメッセージの定義確認"""
-    print("\n" + "=" * 70)
+    print("\n" + BAR)
     print("📋 テスト5: エラーメッセージ定義の確認")
-    print("=" * 70)
+    print(BAR)
     
     print(f"\n📚 定義されているエラーメッセージ: {len(ERROR_MESSAGES)}件")
-    print("-" * 70)
+    print(SUB)
     print(f"{'ID':<5} {'日本語':<40} {'英語':<40}")
-    print("-" * 70)
+    print(SUB)
     
     for error_id in sorted(ERROR_MESSAGES.keys()):
-        msg_def = ERROR_MESSAGES[error_id]
-        ja_msg = msg_def.get("ja", "未定義")
-        en_msg = msg_def.get("en", "未定義")
+        ja_msg = ERROR_MESSAGES_JA.get(error_id) or "未定義"
+        en_msg = ERROR_MESSAGES_EN.get(error_id) or "未定義"
         print(f"{error_id:<5} {ja_msg:<40} {en_msg:<40}")
     
-    print("-" * 70)
+    print(SUB)
     print("✅ すべてのエラーメッセージが正しく定義されています")
     return True
 
 
 def test_english_logger():
     """英語ログのテスト（config.iniの言語設定を変更）"""
-    print("\n" + "=" * 70)
+    print("\n" + BAR)
     print("📋 テスト6: 英語ログ記録（config.ini経由）")
-    print("=" * 70)
+    print(BAR)
     
     # config.iniのバックアップを作成
     config_path = "config.ini"
     backup_path = "config.ini.backup"
     
+    # 前回のテストが中断された場合のバックアップが残っていれば先に復元する
+    if os.path.exists(backup_path):
+        os.replace(backup_path, config_path)
+        print(f"🔄 前回のバックアップからconfig.iniを復元しました: {backup_path}")
+    
     has_config = os.path.exists(config_path)
     if has_config:
-        import shutil
-        shutil.copy(config_path, backup_path)
+        # ハードリンクでバックアップ（内容のコピーは行わず、config.ini も残したままにする）
+        try:
+            os.link(config_path, backup_path)
+        except OSError:
+            # ハードリンク非対応のファイルシステム
+            shutil.copy2(config_path, backup_path)
         print(f"✅ config.iniをバックアップしました: {backup_path}")
     
     # 英語設定のconfig.iniを作成
     try:
-        import configparser
         config = configparser.ConfigParser()
         config['General'] = {'language': 'en'}
         config['Server'] = {'websocket_url': 'ws://localhost:8765'}
@@ -204,11 +237,17 @@ def test_english_logger():
             'hash_dir_name': 'hashes'
         }
         
-        with open(config_path, 'w', encoding='utf-8') as f:
+        # バックアップとリンクしている元ファイルを書き換えないよう、別ファイルに書いて置き換える
+        temp_config_path = config_path + ".tmp"
+        with open(temp_config_path, 'w', encoding='utf-8') as f:
             config.write(f)
+        os.replace(temp_config_path, config_path)
         
         print("✅ 英語設定のconfig.iniを作成しました")
         
+        # 言語設定はモジュール読み込み時にキャッシュされるため再読み込み
+        set_language()
+        
         # 英語モードのロガーを作成
         test_log_file = "test_error_en.log"
         
@@ -232,13 +271,14 @@ def test_english_logger():
         if os.path.exists(test_log_file):
             print(f"\n✅ English log file created: {test_log_file}")
             print("\n📄 Log file contents:")
-            print("-" * 70)
-            with open(test_log_file, 'r', encoding='utf-8') as f:
+            print(SUB)
+            with open(test_log_file, 'r', encoding='utf-8', buffering=LOG_READ_BUFFER_SIZE) as f:
                 content = f.read()
                 print(content)
-            print("-" * 70)
+            print(SUB)
             
             # クリーンアップ
+            logger.close()
             os.remove(test_log_file)
             print(f"🧹 Cleaned up: {test_log_file}")
             
@@ -258,19 +298,19 @@ def test_english_logger():
     finally:
         # config.iniを復元
         if has_config and os.path.exists(backup_path):
-            import shutil
-            shutil.move(backup_path, config_path)
+            os.replace(backup_path, config_path)
             print(f"\n🔄 config.iniを復元しました")
         elif not has_config and os.path.exists(config_path):
             os.remove(config_path)
             print(f"\n🔄 テスト用config.iniを削除しました")
+        set_language()
 
 
 def cleanup():
     """テスト後のクリーンアップ"""
-    print("\n" + "=" * 70)
+    print("\n" + BAR)
     print("🧹 クリーンアップ")
-    print("=" * 70)
+    print(BAR)
     
     test_log_file = "test_error.log"
     if os.path.exists(test_log_file):
@@ -282,6 +322,8 @@ def cleanup():
         try:
             choice = input("\n選択してください (1/2): ").strip()
             if choice == "1":
+                # グローバルロガーが開いたままのログファイルを閉じてから削除
+                get_logger(test_log_file).close()
                 os.remove(test_log_file)
                 print(f"✅ テストログファイルを削除しました: {test_log_file}")
             else:
@@ -292,9 +334,9 @@ def cleanup():
 
 def main():
     """メイン処理"""
-    print("=" * 70)
+    print(BAR)
     print("🧪 ErrorLogger 単体テスト")
-    print("=" * 70)
+    print(BAR)
     print()
     
     # テスト結果を記録
@@ -309,9 +351,9 @@ def main():
     results.append(("英語ログ記録", test_english_logger()))
     
     # テスト結果サマリー
-    print("\n" + "=" * 70)
+    print("\n" + BAR)
     print("📊 テスト結果サマリー")
-    print("=" * 70)
+    print(BAR)
     
     passed = sum(1 for _, result in results if result)
     total = len(results)
@@ -320,9 +362,9 @@ def main():
         status = "✅ PASS" if result else "❌ FAIL"
         print(f"   {status}  {test_name}")
     
-    print("-" * 70)
+    print(SUB)
     print(f"   合計: {passed}/{total} テスト成功")
-    print("=" * 70)
+    print(BAR)
     
     # クリーンアップ
     cleanup()